@@ -22,6 +22,7 @@ Dependencies:
 """
 from os import getenv
 from pathlib import Path
+from tempfile import gettempdir
 from datetime import timedelta
 from django.core.management.utils import get_random_secret_key
 
@@ -71,6 +72,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hng.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -105,6 +107,55 @@ DATABASES = {
     )
 }
 
+# Organisation shards, e.g.
+# ORGANISATION_SHARD_URLS=sqlite:///shard_0.sqlite3,sqlite:///shard_1.sqlite3
+# Each URL becomes a `shard_<n>` database. Organisations and their
+# memberships are spread over ORGANISATION_SHARDS (all of them unless
+# listed explicitly, `default` when there are none) by hng.sharding.
+#
+# Cutover: create the shards with `manage.py migrate --database shard_<n>`,
+# then deploy with the new ORGANISATION_SHARDS, then run
+# `manage.py rebalance_shards`. Until it has finished, organisations still
+# on their old database are found through the membership directory, so
+# keep that database configured until it is drained.
+for index, url in enumerate(filter(None, getenv('ORGANISATION_SHARD_URLS', '').split(','))):
+    DATABASES[f'shard_{index}'] = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+
+ORGANISATION_SHARDS = (
+    getenv('ORGANISATION_SHARDS', '').split(',') if getenv('ORGANISATION_SHARDS')
+    else [alias for alias in DATABASES if alias.startswith('shard_')] or ['default']
+)
+
+DATABASE_ROUTERS = ['hng.routers.OrganisationShardRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Stored responses for Idempotency-Key retries. TIMEOUT bounds how long a
+# key is remembered and MAX_ENTRIES how many are kept. Deployments running
+# several processes should point this at a shared backend (e.g. Redis) so
+# duplicates landing on different workers still wait on each other.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'idempotency': {
+        'BACKEND': getenv('IDEMPOTENCY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': getenv('IDEMPOTENCY_CACHE_LOCATION', 'idempotency'),
+        'TIMEOUT': int(getenv('IDEMPOTENCY_TTL', 60 * 60 * 24)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(getenv('IDEMPOTENCY_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Shared by the server processes and `manage.py dump_profiles`. Recording
+    # from several processes is best-effort here, exact on Redis or Memcached
+    'profiling': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': getenv('PROFILING_CACHE_LOCATION', str(Path(gettempdir()) / 'hng-profiles')),
+        'TIMEOUT': None,
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -124,6 +175,42 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/
+
+# The first hasher hashes new passwords, the others only verify existing
+# hashes. Users are moved to the first one (or to a changed profile) the
+# next time they log in. Measure the options with `manage.py bench_hashers`.
+PASSWORD_HASHERS = getenv(
+    'PASSWORD_HASHERS',
+    'hng.hashers.TunablePBKDF2PasswordHasher,'
+    'hng.hashers.TunableScryptPasswordHasher,'
+    'hng.hashers.TunableArgon2PasswordHasher,'
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+).split(',')
+
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2_sha256': {
+        'iterations': int(getenv('PBKDF2_ITERATIONS', 720000)),
+    },
+    'scrypt': {
+        'work_factor': int(getenv('SCRYPT_WORK_FACTOR', 2 ** 14)),
+        'block_size': int(getenv('SCRYPT_BLOCK_SIZE', 8)),
+        'parallelism': int(getenv('SCRYPT_PARALLELISM', 1)),
+    },
+    'argon2': {
+        'time_cost': int(getenv('ARGON2_TIME_COST', 2)),
+        'memory_cost': int(getenv('ARGON2_MEMORY_COST', 102400)),
+        'parallelism': int(getenv('ARGON2_PARALLELISM', 8)),
+    },
+}
+
+# Re-hash outdated passwords on a background thread after login, keeping
+# at most PASSWORD_REHASH_MAX_PENDING waiting (later ones are dropped)
+PASSWORD_REHASH_IN_BACKGROUND = True
+PASSWORD_REHASH_MAX_PENDING = 100
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -156,6 +243,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'hng.User'
 
+# Parallel runner with a cheap password hasher, see tests/runner.py
+TEST_RUNNER = 'tests.runner.FastTestRunner'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -169,3 +259,40 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'userId',
     'TOKEN_OBTAIN_SERIALIZER': 'hng.serializers.CustomTokenObtainPairSerializer',
 }
+
+# Post-registration side effects delivered by `manage.py run_outbox`.
+# Hooks are dotted paths to callables taking an hng.models.OutboxEvent;
+# events are only recorded for topics that have hooks.
+OUTBOX = {
+    'HOOKS': {
+        'user.registered': [],
+    },
+    'BATCH_SIZE': 100,
+    'MAX_WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': timedelta(seconds=30),
+    'LEASE': timedelta(minutes=5),
+}
+
+# Idempotency-Key handling for register, create-organisation and add-user.
+# LOCK_TIMEOUT frees a key whose first request died, WAIT_TIMEOUT is how long
+# a concurrent duplicate waits for the first one before getting a 409.
+IDEMPOTENCY = {
+    'CACHE': 'idempotency',
+    'LOCK_TIMEOUT': 30,
+    'WAIT_TIMEOUT': 10,
+    'POLL_INTERVAL': 0.05,
+}
+
+# Opt-in request profiling, see hng/profiling.py. Staff send the X-Profile
+# header ("cprofile" or "sampling"); SAMPLE_RATE profiles random requests.
+PROFILING = {
+    'ENABLED': bool(getenv('PROFILING_ENABLED', False)),
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': float(getenv('PROFILING_SAMPLE_RATE', 0.0)),
+    'MODE': getenv('PROFILING_MODE', 'cprofile'),
+    'TOP_N': 25,
+    'BUFFER_SIZE': 50,
+    'SAMPLING_INTERVAL': 0.001,
+    'CACHE': 'profiling',
+}
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
-from .models import Organisation
+from .models import Organisation, OutboxEvent
 
 User = get_user_model()
 
 
 admin.site.register(User)
 admin.site.register(Organisation)
+admin.site.register(OutboxEvent)
@@ -0,0 +1,126 @@
+"""
+Password hashers whose cost is read from ``settings.PASSWORD_HASHER_PROFILES``
+and helpers to move users onto the preferred hasher after they log in.
+
+The tunable hashers keep Django's algorithm names, so hashes created by
+the stock hashers still verify, and a hash whose parameters differ from
+the configured profile is reported as needing an update.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+def hasher_profile(algorithm):
+    return getattr(settings, 'PASSWORD_HASHER_PROFILES', {}).get(algorithm, {})
+
+
+def profile_parameter(name, default):
+    return property(lambda self: hasher_profile(self.algorithm).get(name, default))
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = profile_parameter('iterations', PBKDF2PasswordHasher.iterations)
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = profile_parameter('work_factor', ScryptPasswordHasher.work_factor)
+    block_size = profile_parameter('block_size', ScryptPasswordHasher.block_size)
+    parallelism = profile_parameter('parallelism', ScryptPasswordHasher.parallelism)
+    maxmem = profile_parameter('maxmem', ScryptPasswordHasher.maxmem)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Needs the optional ``argon2-cffi`` package.
+    """
+    time_cost = profile_parameter('time_cost', Argon2PasswordHasher.time_cost)
+    memory_cost = profile_parameter('memory_cost', Argon2PasswordHasher.memory_cost)
+    parallelism = profile_parameter('parallelism', Argon2PasswordHasher.parallelism)
+
+
+def needs_rehash(encoded):
+    """
+    Whether ``encoded`` was made by another hasher than the preferred one,
+    or by the preferred one with different parameters.
+    """
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def rehash(user_pk, encoded, raw_password):
+    # Only replace the hash that was verified, a password changed in the
+    # meantime must not be overwritten
+    get_user_model().objects.filter(pk=user_pk, password=encoded).update(
+        password=make_password(raw_password),
+    )
+
+
+def rehash_in_background(user_pk, encoded, raw_password):
+    try:
+        rehash(user_pk, encoded, raw_password)
+    finally:
+        close_old_connections()
+
+
+class RehashQueue:
+    """
+    One background thread upgrading hashes. At most
+    ``PASSWORD_REHASH_MAX_PENDING`` upgrades wait at a time; past that they
+    are dropped, and the user is upgraded on a later login, rather than
+    keeping more raw passwords in memory.
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rehash')
+        self.lock = threading.Lock()
+        self.pending = 0
+
+    def submit(self, user_pk, encoded, raw_password):
+        with self.lock:
+            if self.pending >= getattr(settings, 'PASSWORD_REHASH_MAX_PENDING', 100):
+                logger.warning("Password rehash for user %s dropped, too many pending", user_pk)
+                return None
+            self.pending += 1
+        future = self.executor.submit(rehash_in_background, user_pk, encoded, raw_password)
+        future.add_done_callback(self.done)
+        return future
+
+    def done(self, future):
+        with self.lock:
+            self.pending -= 1
+        if future.exception() is not None:
+            logger.error("Background password rehash failed", exc_info=future.exception())
+
+
+_rehashes = RehashQueue()
+
+
+def schedule_rehash(user, raw_password):
+    """
+    Upgrade ``user``'s stored hash with the preferred hasher. By default
+    this runs on a background thread so the login response does not wait
+    for a second hash computation.
+    """
+    if getattr(settings, 'PASSWORD_REHASH_IN_BACKGROUND', True):
+        _rehashes.submit(user.pk, user.password, raw_password)
+    else:
+        rehash(user.pk, user.password, raw_password)
@@ -0,0 +1,156 @@
+"""
+``Idempotency-Key`` support for unsafe endpoints.
+
+The first request carrying a key reserves it in the idempotency cache,
+runs the view and stores the response if it succeeded or was rejected
+as invalid. Retries with the same key get the stored status and body back
+without the view running again, and a retry arriving while the first
+request is still in flight waits for it to finish. The TTL and size of the store are those of the cache configured
+in ``settings.IDEMPOTENCY['CACHE']``.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Empty
+from rest_framework.response import Response
+
+
+DEFAULTS = {
+    'CACHE': 'idempotency',
+    'LOCK_TIMEOUT': 30,
+    'WAIT_TIMEOUT': 10,
+    'POLL_INTERVAL': 0.05,
+}
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+PENDING = 'pending'
+DONE = 'done'
+
+
+def idempotency_setting(name):
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[idempotency_setting('CACHE')]
+
+
+def cache_key(request, key):
+    # Anonymous clients can't be told apart, so their keys are scoped to the
+    # request body as well and two of them picking the same key don't collide
+    scope = str(request.user.pk) if request.user.is_authenticated else 'anonymous:' + fingerprint(request)
+    raw = '\n'.join([scope, request.method, request.path, key])
+    return 'idempotency:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def fingerprint(request):
+    # Keyed with SECRET_KEY: register bodies carry a password, and a plain
+    # hash kept in a shared cache could be attacked offline
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return salted_hmac('hng.idempotency.fingerprint', body, algorithm='sha256').hexdigest()
+
+
+def wait_for(cache, key, body):
+    """
+    Poll until the request holding ``key`` has stored its response, the
+    entry disappears or ``WAIT_TIMEOUT`` elapses. A request for a
+    different body does not wait, it is rejected straight away.
+    """
+    deadline = time.monotonic() + idempotency_setting('WAIT_TIMEOUT')
+    entry = cache.get(key)
+    while (entry is not None and entry['state'] == PENDING and entry['fingerprint'] == body
+           and time.monotonic() < deadline):
+        time.sleep(idempotency_setting('POLL_INTERVAL'))
+        entry = cache.get(key)
+    return entry
+
+
+def replay(entry):
+    return Response(entry['data'], status=entry['status'], headers={'Idempotent-Replayed': 'true'})
+
+
+def mismatch():
+    payload = {
+        'errors': [{
+            'field': 'Idempotency-Key',
+            'message': 'This key was already used with a different request body.'
+        }]
+    }
+    return Response(payload, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+def in_progress():
+    payload = {
+        'status': 'Conflict',
+        'message': 'A request with this idempotency key is still in progress',
+        'statusCode': status.HTTP_409_CONFLICT
+    }
+    return Response(payload, status=status.HTTP_409_CONFLICT)
+
+
+def remembered(response):
+    # Only outcomes a retry would repeat are stored: successes and validation
+    # errors. The views answer unexpected failures (a database outage
+    # included) with a generic 400, which a retry may well get past.
+    return status.is_success(response.status_code) or response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def idempotent(view_method):
+    """
+    Make a viewset method honour the ``Idempotency-Key`` header.
+    Requests without the header are not affected.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        try:
+            body = fingerprint(request)
+        except ParseError:
+            # A malformed body is the view's to report, as without the header.
+            # DRF hands out empty data after a parse error, clear that so the
+            # view's own access fails the same way.
+            request._data = request._files = request._full_data = Empty
+            return view_method(self, request, *args, **kwargs)
+
+        cache = get_cache()
+        entry_key = cache_key(request, key)
+
+        while not cache.add(entry_key, {'state': PENDING, 'fingerprint': body}, idempotency_setting('LOCK_TIMEOUT')):
+            entry = wait_for(cache, entry_key, body)
+            if entry is None:
+                # The first request failed or its reservation expired, try to take over
+                continue
+            if entry['fingerprint'] != body:
+                return mismatch()
+            if entry['state'] == PENDING:
+                return in_progress()
+            return replay(entry)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(entry_key)
+            raise
+
+        if not remembered(response):
+            cache.delete(entry_key)
+        else:
+            cache.set(entry_key, {
+                'state': DONE,
+                'fingerprint': body,
+                'status': response.status_code,
+                'data': response.data,
+            })
+        return response
+
+    return wrapper
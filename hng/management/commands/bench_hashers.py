@@ -0,0 +1,42 @@
+import os
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Measure hashes per second on one core for each configured password hasher."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=2.0, help="Seconds spent on each measurement.")
+        parser.add_argument('--password', default='correct horse battery staple')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{os.cpu_count()} cores available, figures are for a single core")
+        for index, hasher in enumerate(get_hashers()):
+            label = f"{hasher.algorithm}{' (default)' if index == 0 else ''}"
+            try:
+                encoded = hasher.encode(options['password'], hasher.salt())
+            except ValueError as error:
+                self.stdout.write(self.style.WARNING(f"{label}: skipped, {error}"))
+                continue
+
+            parameters = {
+                key: value for key, value in hasher.decode(encoded).items()
+                if key not in ('algorithm', 'hash', 'salt')
+            }
+            encodes = self.rate(lambda: hasher.encode(options['password'], hasher.salt()), options['duration'])
+            verifies = self.rate(lambda: hasher.verify(options['password'], encoded), options['duration'])
+            self.stdout.write(
+                f"{label}: {parameters} "
+                f"{encodes:.2f} hashes/s, {verifies:.2f} verifies/s"
+            )
+
+    @staticmethod
+    def rate(operation, duration):
+        count, started = 0, time.perf_counter()
+        while (elapsed := time.perf_counter() - started) < duration:
+            operation()
+            count += 1
+        return count / elapsed
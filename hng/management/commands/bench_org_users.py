@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from hng.models import Organisation, Membership
+from hng.views import OrganisationViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark GET /api/organisations/<orgId>/users against a large organisation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100_000)
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--pages', type=int, default=None, help="Stop after this many pages (default: walk them all).")
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        org = Organisation(name='Benchmark Organisation')
+        shard = router.db_for_write(Organisation, instance=org)
+        # Everything is rolled back at the end so the benchmark leaves no data behind
+        with transaction.atomic(), transaction.atomic(using=shard):
+            requester = self.seed(org, options['members'], options['batch_size'])
+            self.walk(org, requester, options['limit'], options['pages'])
+            transaction.set_rollback(True)
+            transaction.set_rollback(True, using=shard)
+
+    def seed(self, org, members, batch_size):
+        started = time.perf_counter()
+        org.save()
+        for offset in range(0, members, batch_size):
+            users = User.objects.bulk_create([
+                User(
+                    email=f'bench-{index}@bench.local',
+                    firstName='Bench',
+                    lastName=str(index),
+                    password='!',
+                )
+                for index in range(offset, min(offset + batch_size, members))
+            ], batch_size=batch_size)
+            Membership.objects.using(org._state.db).bulk_create(
+                [Membership(organisation=org, user=user) for user in users],
+                batch_size=batch_size,
+            )
+        self.stdout.write(f"Seeded {members} members in {time.perf_counter() - started:.2f}s")
+        return User.objects.get(userId=org.membership_set.values_list('user_id', flat=True).first())
+
+    def walk(self, org, requester, limit, pages):
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        view = OrganisationViewSet.as_view({'get': 'list_users'})
+        url = f'/api/organisations/{org.orgId}/users?limit={limit}'
+        timings = []
+        page = 0
+        while url is not None and (pages is None or page < pages):
+            request = factory.get(url)
+            force_authenticate(request, user=requester)
+            with CaptureQueriesContext(connections['default']) as queries, \
+                    CaptureQueriesContext(connections[org._state.db]) as shard_queries:
+                started = time.perf_counter()
+                response = view(request, orgId=str(org.orgId))
+                response.render()
+                elapsed = time.perf_counter() - started
+            query_count = len(queries) if org._state.db == 'default' else len(queries) + len(shard_queries)
+            timings.append(elapsed)
+            self.stdout.write(
+                f"page {page + 1:>5}: {len(response.data['data']['users']):>5} users "
+                f"{elapsed * 1000:8.2f} ms {query_count:>3} queries"
+            )
+            url = response.data['data']['next']
+            page += 1
+
+        if timings:
+            first, last = timings[0], timings[-1]
+            timings.sort()
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(timings)} pages, first {first * 1000:.2f} ms, last {last * 1000:.2f} ms, "
+                f"median {timings[len(timings) // 2] * 1000:.2f} ms, max {timings[-1] * 1000:.2f} ms"
+            ))
@@ -0,0 +1,31 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from hng.profiling import ProfileStore
+
+
+class Command(BaseCommand):
+    help = "Write recorded sampling profiles as collapsed stacks (flamegraph.pl / speedscope input)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('url_names', nargs='*', help="Only dump these URL names (default: all).")
+        parser.add_argument('--clear', action='store_true', help="Empty the profile buffer afterwards.")
+
+    def handle(self, *args, **options):
+        store = ProfileStore()
+        stacks, without_stacks = Counter(), 0
+        for url_name in options['url_names'] or store.url_names():
+            for entry in store.entries(url_name):
+                if not entry['stacks']:
+                    without_stacks += 1
+                for stack, count in entry['stacks'].items():
+                    # The URL name becomes the root frame so routes can be told apart
+                    stacks[f'{url_name};{stack}'] += count
+
+        for stack, count in sorted(stacks.items()):
+            self.stdout.write(f'{stack} {count}')
+        if without_stacks:
+            self.stderr.write(f"Skipped {without_stacks} cProfile profiles, only sampling profiles have stacks")
+        if options['clear']:
+            store.clear()
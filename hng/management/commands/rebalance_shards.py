@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hng.models import Organisation, Membership, MembershipDirectory
+from hng.sharding import shard_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Move organisations and their memberships to the shard the hash ring "
+        "assigns them. Run after changing ORGANISATION_SHARDS; a shard being "
+        "retired must stay in DATABASES until it has been drained."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', dest='sources',
+            help="Database to drain (repeatable, default: every configured database).",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would move.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for source in options['sources'] or list(settings.DATABASES):
+            moved = 0
+            for orgId in self.organisation_ids(source, options['batch_size']):
+                target = shard_for(orgId)
+                if target == source:
+                    continue
+                if not options['dry_run']:
+                    self.move(orgId, source, target)
+                moved += 1
+            self.stdout.write(f"{source}: {moved} organisations {'to move' if options['dry_run'] else 'moved'}")
+            total += moved
+        self.stdout.write(self.style.SUCCESS(f"{total} organisations {'to move' if options['dry_run'] else 'moved'}"))
+
+    def organisation_ids(self, source, batch_size):
+        # Keyset batches, so moving (deleting) rows doesn't disturb the scan
+        last = None
+        while True:
+            queryset = Organisation.objects.using(source).order_by('orgId')
+            if last is not None:
+                queryset = queryset.filter(orgId__gt=last)
+            batch = list(queryset.values_list('orgId', flat=True)[:batch_size])
+            if not batch:
+                return
+            yield from batch
+            last = batch[-1]
+
+    def move(self, orgId, source, target):
+        organisation = Organisation.objects.using(source).get(orgId=orgId)
+        # The copy is committed on the target before the source is deleted,
+        # so an interrupted run leaves a copy that the next run completes
+        with transaction.atomic(using=target):
+            if not Organisation.objects.using(target).filter(orgId=orgId).exists():
+                organisation.save(using=target, force_insert=True)
+            self.copy_memberships(orgId, source, target)
+        with transaction.atomic(using=source):
+            # Members may have been added on the source meanwhile. Holding its
+            # row stops more from being added (their foreign key needs it)
+            # while those are copied and the source is deleted.
+            Organisation.objects.using(source).select_for_update().get(orgId=orgId)
+            self.copy_memberships(orgId, source, target)
+            MembershipDirectory.objects.filter(orgId=orgId).update(shard=target)
+            Organisation.objects.using(source).filter(orgId=orgId).delete()
+
+    def copy_memberships(self, orgId, source, target):
+        userIds = Membership.objects.using(source).filter(organisation_id=orgId).values_list('user_id', flat=True)
+        Membership.objects.using(target).bulk_create(
+            [Membership(organisation_id=orgId, user_id=userId) for userId in userIds],
+            ignore_conflicts=True,
+        )
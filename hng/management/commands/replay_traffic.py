@@ -0,0 +1,61 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from hng.replay import HttpTransport, Replayer, TestClientTransport
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a JSONL log of API calls (see hng.replay for the format) and report "
+        "throughput, latency percentiles and error rates per route. Without --base-url "
+        "the calls go through Django's test client and write to the configured database, "
+        "which takes --allow-writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help="JSONL file to replay, or - for stdin.")
+        parser.add_argument('--base-url', help="Replay against a running server, e.g. http://127.0.0.1:8000.")
+        parser.add_argument('--allow-writes', action='store_true',
+                            help="Replay in-process, registering users and organisations in the configured database.")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--capture-timeout', type=float, default=30.0,
+                            help="Seconds a call waits for a value captured by an earlier one.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            transport = HttpTransport(options['base_url'])
+        elif options['allow_writes']:
+            transport = TestClientTransport()
+        else:
+            raise CommandError(
+                "Without --base-url the replay writes to the configured database "
+                f"({settings.DATABASES['default']['NAME']}), pass --allow-writes if that is intended."
+            )
+        replayer = Replayer(transport, options['concurrency'], options['capture_timeout'])
+        try:
+            lines = sys.stdin if options['log'] == '-' else open(options['log'])
+        except OSError as error:
+            raise CommandError(error)
+        with lines:
+            report = replayer.run(lines)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'route':<48} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'4xx':>5} {'err %':>6}"
+        )
+        for route, summary in [*report['routes'].items(), ('TOTAL', report['total'])]:
+            self.stdout.write(
+                f"{route[:48]:<48} {summary['requests']:>6} {summary['throughput']:>8.1f} "
+                f"{summary['p50_ms']:>8.2f} {summary['p90_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+                f"{summary['client_errors']:>5} {summary['error_rate'] * 100:>6.1f}"
+            )
+        if report['total']['last_error']:
+            self.stderr.write(f"Last error: {report['total']['last_error']}")
+        self.stdout.write(f"Replayed in {report['elapsed']:.2f}s")
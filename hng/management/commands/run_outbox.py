@@ -0,0 +1,31 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from hng import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox events to their configured hooks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when no event is due.")
+        parser.add_argument('--once', action='store_true', help="Exit once every due event has been handled.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = outbox.drain_all(options['batch_size'], options['workers'])
+            self.stdout.write(f"Handled {total} outbox events")
+            return
+
+        workers = options['workers'] or outbox.outbox_setting('MAX_WORKERS')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    if not outbox.drain(pool, options['batch_size']):
+                        time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping outbox worker")
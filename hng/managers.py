@@ -1,6 +1,12 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
 from django.utils.translation import gettext_lazy as _
 
+from .sharding import shard_for
+
 
 class CustomUserManager(BaseUserManager):
     """
@@ -25,4 +31,26 @@ class CustomUserManager(BaseUserManager):
         """
         Create and save a SuperUser with the given email and password.
         """
-        return self.create_user(email, password, **extra_fields)
\ No newline at end of file
+        extra_fields.setdefault("is_staff", True)
+        extra_fields.setdefault("is_superuser", True)
+        return self.create_user(email, password, **extra_fields)
+
+    def get_by_natural_key(self, email):
+        # Emails are unique regardless of case, matching on lower(email)
+        # lets the lookup use the same index. Both sides are folded by the
+        # database, whose lower() may differ from Python's outside ASCII.
+        return self.get(Exact(Lower('email'), Lower(Value(email))))
+
+
+class OrganisationQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """
+        Create the organisation on the shard its orgId maps to, unless a
+        database was chosen with ``using()``.
+        """
+        organisation = self.model(**kwargs)
+        organisation.save(force_insert=True, using=self._db or shard_for(organisation.orgId))
+        return organisation
+
+
+OrganisationManager = models.Manager.from_queryset(OrganisationQuerySet)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hng', '0002_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_staff',
+            field=models.BooleanField(default=False, verbose_name='staff status'),
+        ),
+    ]
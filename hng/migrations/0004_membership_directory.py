@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_directory(apps, schema_editor):
+    # Existing memberships all live in the default database
+    if schema_editor.connection.alias != 'default':
+        return
+    Membership = apps.get_model('hng', 'Membership')
+    MembershipDirectory = apps.get_model('hng', 'MembershipDirectory')
+    memberships = Membership.objects.using('default').values_list('user_id', 'organisation_id')
+    MembershipDirectory.objects.using('default').bulk_create(
+        [MembershipDirectory(user_id=user_id, orgId=orgId, shard='default') for user_id, orgId in memberships.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hng', '0003_user_is_staff'),
+    ]
+
+    operations = [
+        # Take over the auto-created membership table as an explicit model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Membership',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('organisation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hng.organisation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'hng_organisation_users',
+                        'unique_together': {('organisation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='organisation',
+                    name='users',
+                    field=models.ManyToManyField(through='hng.Membership', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='membership',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='MembershipDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orgId', models.UUIDField(db_index=True)),
+                ('shard', models.CharField(max_length=100)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'orgId')},
+            },
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:24
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hng', '0004_membership_directory'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='hng_user_email_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hng', '0005_user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_superuser',
+            field=models.BooleanField(default=False, verbose_name='superuser status'),
+        ),
+    ]
@@ -1,8 +1,11 @@
 import uuid
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractBaseUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .managers import CustomUserManager
+from .managers import CustomUserManager, OrganisationManager
 
 
 class User(AbstractBaseUser):
@@ -11,6 +14,8 @@ class User(AbstractBaseUser):
     firstName = models.CharField(_("first name"), max_length=150)
     lastName = models.CharField(_("last name"), max_length=150)
     phone = models.CharField(max_length=256, blank=True)
+    is_staff = models.BooleanField(_("staff status"), default=False)
+    is_superuser = models.BooleanField(_("superuser status"), default=False)
     last_login = None
     
     USERNAME_FIELD = 'email'
@@ -18,8 +23,27 @@ class User(AbstractBaseUser):
 
     objects = CustomUserManager()
 
+    class Meta:
+        constraints = [
+            # Emails differing only in case belong to the same person
+            models.UniqueConstraint(Lower('email'), name='hng_user_email_ci_unique'),
+        ]
+
     def __str__(self):
         return self.email
+
+    # There are no per-model permissions, the admin is for superusers only.
+    # Staff status alone just opens staff endpoints such as profiling.
+    def has_perm(self, perm, obj=None):
+        return self.is_superuser
+
+    def has_module_perms(self, app_label):
+        return self.is_superuser
+
+    def check_password(self, raw_password):
+        # Unlike Django's default, an outdated hash is not re-hashed and saved
+        # here. Logins upgrade it off the request path, see hng.hashers.
+        return check_password(raw_password, self.password)
     
 
 
@@ -28,7 +52,65 @@ class Organisation(models.Model):
     orgId = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True)
     name = models.CharField(max_length=255)
     description = models.TextField(max_length=255, blank=True)
-    users = models.ManyToManyField(User)
+    users = models.ManyToManyField(User, through='Membership')
+
+    objects = OrganisationManager()
 
     def __str__(self):
         return self.name
+
+
+class Membership(models.Model):
+    """
+    Lives on the same shard as its organisation. Users stay in the default
+    database, so the user foreign key carries no database constraint.
+    """
+    organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+
+    class Meta:
+        db_table = 'hng_organisation_users'
+        unique_together = [('organisation', 'user')]
+
+
+class MembershipDirectory(models.Model):
+    """
+    Per-user index of organisation memberships and the shard holding each
+    organisation, kept in the default database so "my organisations" and
+    shared-membership lookups don't fan out to every shard.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    orgId = models.UUIDField(db_index=True)
+    shard = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = [('user', 'orgId')]
+
+
+class OutboxEvent(models.Model):
+    """
+    A side effect recorded in the same transaction as the change that
+    caused it, delivered later by ``manage.py run_outbox``.
+    """
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, _('pending')),
+        (FAILED, _('failed')),
+    ]
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} ({self.status})"
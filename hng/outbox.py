@@ -0,0 +1,118 @@
+"""
+Transactional outbox for side effects that must not run inside a request.
+
+Callers record an event with ``enqueue`` inside the transaction that makes
+the change; ``manage.py run_outbox`` later claims pending events in batches
+and hands each one to the hooks configured for its topic in
+``settings.OUTBOX['HOOKS']``. A hook is any callable taking the event.
+Topics without hooks are not recorded at all.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+
+DEFAULTS = {
+    'HOOKS': {},
+    'BATCH_SIZE': 100,
+    'MAX_WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': timedelta(seconds=30),
+    'LEASE': timedelta(minutes=5),
+}
+
+
+def outbox_setting(name):
+    return getattr(settings, 'OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+def enqueue(topic, payload):
+    # Nothing would ever consume an event for a topic without hooks
+    if not outbox_setting('HOOKS').get(topic):
+        return None
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def get_hooks(topic):
+    return [import_string(path) for path in outbox_setting('HOOKS').get(topic, [])]
+
+
+def claim(batch_size):
+    """
+    Lease up to ``batch_size`` due events. A claimed event is pushed
+    ``LEASE`` into the future, so it becomes due again if the worker
+    holding it dies before recording the outcome.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.PENDING, available_at__lte=now)
+            .order_by('available_at')[:batch_size]
+        )
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            attempts=F('attempts') + 1,
+            available_at=now + outbox_setting('LEASE'),
+        )
+    for event in events:
+        event.attempts += 1
+    return events
+
+
+def deliver(event):
+    try:
+        for hook in get_hooks(event.topic):
+            hook(event)
+    finally:
+        # Hooks run on pool threads, which own their database connections
+        close_old_connections()
+
+
+def record_failure(event, error):
+    event.last_error = repr(error)
+    if event.attempts >= outbox_setting('MAX_ATTEMPTS'):
+        event.status = OutboxEvent.FAILED
+    else:
+        delay = outbox_setting('RETRY_DELAY') * 2 ** (event.attempts - 1)
+        event.available_at = timezone.now() + delay
+    event.save(update_fields=['status', 'last_error', 'available_at'])
+
+
+def drain(pool, batch_size=None):
+    """
+    Deliver one batch of due events on ``pool`` and return how many
+    were claimed. Delivered events are deleted, failed ones are retried
+    with exponential backoff until ``MAX_ATTEMPTS`` is reached.
+    """
+    events = claim(batch_size or outbox_setting('BATCH_SIZE'))
+    futures = {pool.submit(deliver, event): event for event in events}
+    delivered = []
+    for future in as_completed(futures):
+        event = futures[future]
+        try:
+            future.result()
+        except Exception as error:
+            record_failure(event, error)
+        else:
+            delivered.append(event.pk)
+    OutboxEvent.objects.filter(pk__in=delivered).delete()
+    return len(events)
+
+
+def drain_all(batch_size=None, max_workers=None):
+    """
+    Deliver every event that is currently due.
+    """
+    total = 0
+    with ThreadPoolExecutor(max_workers=max_workers or outbox_setting('MAX_WORKERS')) as pool:
+        while claimed := drain(pool, batch_size):
+            total += claimed
+    return total
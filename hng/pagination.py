@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MembershipCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the organisation membership table.
+
+    Ordering on ``user_id`` lets every page be served straight from the
+    (organisation_id, user_id) unique index, so deep pages cost the same
+    as the first one.
+    """
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    ordering = 'user_id'
@@ -3,4 +3,5 @@ from rest_framework.permissions import IsAuthenticated
 
 class IsMember(IsAuthenticated):
     def has_object_permission(self, request, view, obj):
-        return obj.users.filter(userId=request.user.userId).exists()
\ No newline at end of file
+        # Membership rows sit on the organisation's shard, users don't
+        return obj.membership_set.filter(user_id=request.user.userId).exists()
\ No newline at end of file
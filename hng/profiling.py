@@ -0,0 +1,244 @@
+"""
+Opt-in request profiling.
+
+When ``settings.PROFILING['ENABLED']`` is set, ``ProfilingMiddleware``
+profiles a request if a staff user sends the profiling header, or at
+random with probability ``SAMPLE_RATE``. The request runs under either
+``cProfile`` or a sampling profiler. The top ``TOP_N`` functions by
+cumulative time are kept per URL name, in a ring buffer of the last
+``BUFFER_SIZE`` profiles. Sampled profiles also keep their collapsed
+stacks, which ``manage.py dump_profiles`` writes out for flamegraph tools.
+
+The buffer lives in the ``PROFILING['CACHE']`` cache so the management
+command can read what the server processes recorded. Recording from
+several processes is best-effort unless that cache is Redis or Memcached,
+see ``ProfileStore``.
+"""
+import cProfile
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': 0.0,
+    'MODE': 'cprofile',
+    'TOP_N': 25,
+    'BUFFER_SIZE': 50,
+    'SAMPLING_INTERVAL': 0.001,
+    'CACHE': 'profiling',
+}
+
+
+def profiling_setting(name):
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def frame_label(code):
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class CProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def summary(self, top_n):
+        stats = pstats.Stats(self.profile).stats
+        by_cumtime = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        top = [
+            {
+                'function': pstats.func_std_string(function),
+                'calls': calls,
+                'tottime': tottime,
+                'cumtime': cumtime,
+            }
+            for function, (_, calls, tottime, cumtime, _) in by_cumtime[:top_n]
+        ]
+        return top, {}
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that started it every ``interval``
+    seconds from a helper thread.
+    """
+    def __init__(self):
+        self.interval = profiling_setting('SAMPLING_INTERVAL')
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.target = threading.get_ident()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def summary(self, top_n):
+        inclusive = Counter()
+        for stack, count in self.samples.items():
+            for function in set(stack.split(';')):
+                inclusive[function] += count
+        top = [
+            {
+                'function': function,
+                'samples': count,
+                'cumtime': count * self.interval,
+            }
+            for function, count in inclusive.most_common(top_n)
+        ]
+        return top, dict(self.samples)
+
+
+PROFILERS = {
+    'cprofile': CProfiler,
+    'sampling': SamplingProfiler,
+}
+
+
+class ProfileStore:
+    """
+    Ring buffer of recent profiles per URL name.
+
+    Each profile gets its own slot, numbered by ``incr`` on a per-URL
+    counter, so recording never rewrites the rest of the buffer. ``incr``
+    is atomic on Redis and Memcached; with the file-based default two
+    processes recording at once may take the same slot and one profile is
+    lost, which is fine for sampling but worth knowing.
+    """
+    index_key = 'profiles:index'
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.cache = caches[profiling_setting('CACHE')]
+        self.size = profiling_setting('BUFFER_SIZE')
+
+    def counter_key(self, url_name):
+        return f'profiles:{url_name}:count'
+
+    def slot_key(self, url_name, number):
+        return f'profiles:{url_name}:{number % self.size}'
+
+    def record(self, url_name, entry):
+        counter = self.counter_key(url_name)
+        self.cache.add(counter, 0)
+        number = self.cache.incr(counter) - 1
+        self.cache.set(self.slot_key(url_name, number), (number, entry))
+        with self.lock:
+            # A name lost to a concurrent update is added again by its next profile
+            url_names = self.cache.get(self.index_key, set())
+            if url_name not in url_names:
+                self.cache.set(self.index_key, url_names | {url_name})
+
+    def url_names(self):
+        return sorted(self.cache.get(self.index_key, set()))
+
+    def entries(self, url_name):
+        count = self.cache.get(self.counter_key(url_name), 0)
+        numbers = range(max(0, count - self.size), count)
+        slots = self.cache.get_many([self.slot_key(url_name, number) for number in numbers])
+        # A slot still holding an older profile is skipped
+        return [
+            slots[key][1]
+            for number in numbers
+            if (key := self.slot_key(url_name, number)) in slots and slots[key][0] == number
+        ]
+
+    def clear(self):
+        keys = [self.index_key]
+        for url_name in self.url_names():
+            keys.append(self.counter_key(url_name))
+            keys += [self.slot_key(url_name, number) for number in range(self.size)]
+        self.cache.delete_many(keys)
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class ProfilingMiddleware:
+    """
+    Staff users ask for a profile by sending the profiling header, either
+    empty or naming a mode ("cprofile" or "sampling"). Other requests are
+    profiled with probability ``SAMPLE_RATE`` in the default ``MODE``.
+    """
+    def __init__(self, get_response):
+        if not profiling_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + profiling_setting('HEADER').upper().replace('-', '_')
+
+    def requested_mode(self, request):
+        if self.header in request.META:
+            if not is_staff(request):
+                return None
+            mode = request.META[self.header]
+            return mode if mode in PROFILERS else profiling_setting('MODE')
+        if random.random() < profiling_setting('SAMPLE_RATE'):
+            return profiling_setting('MODE')
+        return None
+
+    def __call__(self, request):
+        mode = self.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        profiler = PROFILERS[mode]()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        url_name = match.view_name if match is not None else request.path
+        top, stacks = profiler.summary(profiling_setting('TOP_N'))
+        ProfileStore().record(url_name, {
+            'mode': mode,
+            'path': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'duration': duration,
+            'timestamp': time.time(),
+            'top': top,
+            'stacks': stacks,
+        })
+        return response
@@ -0,0 +1,278 @@
+"""
+Replay a JSONL log of API calls and report throughput, latency
+percentiles and error rates per route.
+
+Each line is one call::
+
+    {"method": "POST", "path": "/api/organisations", "identity": "alice",
+     "body": {"name": "Team"}, "capture": {"team": "data.orgId"}}
+
+``identity`` names a client. The first time an identity is seen a fresh
+user is registered for it, and its calls carry that user's token.
+Strings in ``path`` and ``body`` may use placeholders:
+
+* ``${alice.userId}``, ``${alice.email}``, ``${alice.orgId}`` (the
+  identity's default organisation)
+* ``${run}``, a token unique to this replay, for fresh emails and names
+* ``${team}``, a value captured from an earlier response through
+  ``capture``, which maps names to dotted paths into the response body
+
+Calls are reported per method and URL name, or per path for calls that
+never got as far as resolving one. The log is read as a stream. Lines go
+to a pool of ``concurrency`` threads, and a line using a capture waits
+until the capture is bound. Other ordering between lines is only kept
+with a concurrency of 1.
+"""
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from django.urls import Resolver404, resolve
+
+
+class Placeholders(Template):
+    idpattern = r'[_a-zA-Z][_a-zA-Z0-9.]*'
+
+
+class ReplayError(Exception):
+    pass
+
+
+class TestClientTransport:
+    """
+    Calls the application in-process through Django's test client, against
+    the configured database.
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, token=None):
+        from django.test import Client
+
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(SERVER_NAME='localhost')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        data = json.dumps(body) if body is not None else ''
+        response = self.local.client.generic(method, path, data, content_type='application/json', **headers)
+        try:
+            return response.status_code, json.loads(response.content)
+        except ValueError:
+            return response.status_code, None
+
+
+class HttpTransport:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+        except HTTPError as error:
+            status, content = error.code, error.read()
+        try:
+            return status, json.loads(content)
+        except ValueError:
+            return status, None
+
+
+class Bindings:
+    """
+    Values available to placeholders, filled in as identities are
+    registered and responses are captured.
+    """
+    def __init__(self, timeout, on_missing=None):
+        self.values = {'run': uuid.uuid4().hex[:12]}
+        self.timeout = timeout
+        self.on_missing = on_missing
+        self.changed = threading.Condition()
+
+    def set(self, name, value):
+        with self.changed:
+            self.values[name] = value
+            self.changed.notify_all()
+
+    def get(self, name):
+        if name not in self.values and self.on_missing is not None:
+            self.on_missing(name)
+        with self.changed:
+            if not self.changed.wait_for(lambda: name in self.values, self.timeout):
+                raise ReplayError(f"${{{name}}} was never bound")
+            return self.values[name]
+
+    def substitute(self, value):
+        if isinstance(value, str):
+            names = {match.group('named') or match.group('braced') for match in Placeholders.pattern.finditer(value)}
+            return Placeholders(value).substitute({name: self.get(name) for name in names if name})
+        if isinstance(value, dict):
+            return {key: self.substitute(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.substitute(item) for item in value]
+        return value
+
+
+def dig(data, path):
+    for key in path.split('.'):
+        data = data[int(key)] if isinstance(data, list) else data[key]
+    return data
+
+
+def route_name(path):
+    # Calls to one endpoint with different ids are reported together
+    try:
+        return resolve(urlsplit(path).path).view_name
+    except Resolver404:
+        return path
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    # Nearest rank
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = defaultdict(int)
+        self.errors = 0
+        self.last_error = None
+
+    def summary(self, elapsed):
+        ordered = sorted(self.latencies)
+        count = len(self.latencies) + self.errors
+        failed = self.errors + sum(number for status, number in self.statuses.items() if status >= 500)
+        return {
+            'requests': count,
+            'throughput': count / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(ordered, 0.50) * 1000,
+            'p90_ms': percentile(ordered, 0.90) * 1000,
+            'p99_ms': percentile(ordered, 0.99) * 1000,
+            'client_errors': sum(number for status, number in self.statuses.items() if 400 <= status < 500),
+            'error_rate': failed / count if count else 0.0,
+            'statuses': dict(sorted(self.statuses.items())),
+            'last_error': self.last_error,
+        }
+
+
+class Replayer:
+    def __init__(self, transport, concurrency=4, capture_timeout=30):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.bindings = Bindings(capture_timeout, on_missing=self.provision_for)
+        self.tokens = {}
+        self.identity_locks = defaultdict(threading.Lock)
+        self.stats = defaultdict(RouteStats)
+        self.lock = threading.Lock()
+
+    def provision(self, identity):
+        """
+        Register a fresh user for ``identity`` and bind its placeholders.
+        """
+        with self.identity_locks[identity]:
+            if identity in self.tokens:
+                return self.tokens[identity]
+            email = f"{re.sub(r'[^a-zA-Z0-9]', '-', identity)}-{self.bindings.values['run']}@replay.local"
+            status, body = self.transport.request('POST', '/auth/register', {
+                'email': email,
+                'password': uuid.uuid4().hex,
+                'firstName': identity,
+                'lastName': 'Replay',
+                'phone': '',
+            })
+            if status != 201:
+                raise ReplayError(f"could not register identity {identity!r}: {status} {body}")
+            token = body['data']['accessToken']
+            _, organisations = self.transport.request('GET', '/api/organisations', token=token)
+            self.bindings.set(f'{identity}.userId', body['data']['user']['userId'])
+            self.bindings.set(f'{identity}.email', email)
+            self.bindings.set(f'{identity}.orgId', organisations['data']['organisations'][0]['orgId'])
+            self.tokens[identity] = token
+            return token
+
+    def provision_for(self, name):
+        # ${bob.userId} may be used before any of bob's own calls
+        identity, _, attribute = name.rpartition('.')
+        if identity and attribute in ('userId', 'email', 'orgId'):
+            self.provision(identity)
+
+    def replay_one(self, record):
+        method = record.get('method', 'GET').upper()
+        route = f"{method} {record['path']}"
+        try:
+            token = self.provision(record['identity']) if record.get('identity') else None
+            path = self.bindings.substitute(record['path'])
+            route = f"{method} {route_name(path)}"
+            body = self.bindings.substitute(record.get('body'))
+            started = time.perf_counter()
+            status, response = self.transport.request(method, path, body, token)
+            elapsed = time.perf_counter() - started
+        except Exception as error:
+            with self.lock:
+                self.stats[route].errors += 1
+                self.stats[route].last_error = repr(error)
+            raise
+
+        with self.lock:
+            self.stats[route].latencies.append(elapsed)
+            self.stats[route].statuses[status] += 1
+        for name, source in record.get('capture', {}).items():
+            try:
+                self.bindings.set(name, dig(response, source))
+            except (KeyError, IndexError, TypeError, ValueError):
+                pass
+
+    def run(self, lines):
+        """
+        Replay every record in ``lines`` and return the report.
+        """
+        started = time.perf_counter()
+        records = (json.loads(line) for line in lines if line.strip())
+        if self.concurrency <= 1:
+            for record in records:
+                self.run_safely(record)
+        else:
+            # Bound the records in flight so the log is never read ahead of the pool
+            slots = threading.BoundedSemaphore(self.concurrency * 2)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for record in records:
+                    slots.acquire()
+                    pool.submit(self.run_safely, record).add_done_callback(lambda _: slots.release())
+        return self.report(time.perf_counter() - started)
+
+    def run_safely(self, record):
+        try:
+            self.replay_one(record)
+        except Exception:
+            # Already counted against the route
+            pass
+
+    def report(self, elapsed):
+        total = RouteStats()
+        for stats in self.stats.values():
+            total.latencies += stats.latencies
+            total.errors += stats.errors
+            total.last_error = stats.last_error or total.last_error
+            for status, number in stats.statuses.items():
+                total.statuses[status] += number
+        return {
+            'elapsed': elapsed,
+            'total': total.summary(elapsed),
+            'routes': {route: stats.summary(elapsed) for route, stats in sorted(self.stats.items())},
+        }
@@ -0,0 +1,59 @@
+from django.conf import settings
+
+from .models import Organisation, Membership, User
+from .sharding import shard_for
+
+
+class OrganisationShardRouter:
+    """
+    Send organisations and memberships to their shard and everything else
+    to the default database.
+
+    Querysets carry no instance hint, so lookups by ``orgId`` have to
+    pick their shard with ``.using(shard_for(orgId))``. Related managers
+    and saves are routed here from the instance.
+
+    From a user (``user.organisation_set``, ``user.membership_set``) there
+    is no telling which shard the organisations are on, so with more than
+    one shard those managers are refused. Go through the organisation
+    instead, ``organisation.users.add(user)``.
+    """
+    sharded_models = (Organisation, Membership)
+    # The initial migration creates User next to the membership table it
+    # used to reference, so shards get an (unused) user table as well
+    shard_tables = ('organisation', 'membership', 'user')
+
+    def db_for_instance(self, instance):
+        if isinstance(instance, Organisation):
+            return instance._state.db or shard_for(instance.orgId)
+        if isinstance(instance, Membership):
+            return instance._state.db or shard_for(instance.organisation_id)
+        if isinstance(instance, User):
+            return self.db_for_user(instance)
+        return None
+
+    def db_for_user(self, user):
+        shards = set(getattr(settings, 'ORGANISATION_SHARDS', ['default']))
+        if len(shards) == 1:
+            return shards.pop()
+        raise ValueError(
+            f"Cannot tell which shard holds the organisations of {user}, "
+            "go through the organisation instead, e.g. organisation.users.add(user)"
+        )
+
+    def db_for_read(self, model, **hints):
+        if issubclass(model, self.sharded_models):
+            return self.db_for_instance(hints.get('instance'))
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if isinstance(obj1, self.sharded_models) or isinstance(obj2, self.sharded_models):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default':
+            return True
+        return app_label == 'hng' and (model_name is None or model_name in self.shard_tables)
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from .models import Organisation
+from .hashers import needs_rehash, schedule_rehash
 
 
 User = get_user_model()
@@ -11,6 +12,8 @@ User = get_user_model()
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
+        if needs_rehash(self.user.password):
+            schedule_rehash(self.user, attrs['password'])
         refresh = self.get_token(self.user)
         access_token = str(refresh.access_token)
         user = UserSerializer(instance=self.user)
@@ -35,6 +38,8 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['firstName','lastName','email','password','phone','userId',]
         read_only_fields = ['userId']
+        # Uniqueness is left to the database, see UserViewSet.perform_create
+        extra_kwargs = {'email': {'validators': []}}
     
     def create(self, validated_data):
         user = User(
@@ -59,3 +64,8 @@ class OrganisationSerializer(serializers.ModelSerializer):
         read_only_fields = ['orgId']
 
 
+class OrganisationMemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['userId','firstName','lastName','email','phone']
+        read_only_fields = fields
@@ -0,0 +1,59 @@
+"""
+Placement of organisations across the databases in
+``settings.ORGANISATION_SHARDS``.
+
+Each organisation, with its memberships, lives on the shard a consistent
+hash ring picks for its ``orgId``. Adding or removing a shard only moves
+the organisations whose ring segment changed hands; ``manage.py
+rebalance_shards`` moves them.
+"""
+import bisect
+import hashlib
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes, replicas=128):
+        points = sorted(
+            (ring_hash(f'{node}:{replica}'), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        index = bisect.bisect(self.hashes, ring_hash(str(key))) % len(self.hashes)
+        return self.nodes[index]
+
+
+@lru_cache(maxsize=8)
+def get_ring(shards):
+    return HashRing(shards)
+
+
+def shard_for(orgId):
+    return get_ring(tuple(getattr(settings, 'ORGANISATION_SHARDS', ['default']))).node_for(orgId)
+
+
+@contextmanager
+def removed_on_failure(organisation):
+    """
+    Delete a just created ``organisation`` (and its memberships) if the
+    block fails. On a shard it is outside the default database's
+    transaction, so nothing else would roll it back.
+    """
+    try:
+        yield organisation
+    except BaseException:
+        if not transaction.get_connection(organisation._state.db).in_atomic_block:
+            organisation.delete()
+        raise
@@ -1,8 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
-from .models import Organisation
+from .models import Organisation, Membership, MembershipDirectory
+from .outbox import enqueue
+from .sharding import removed_on_failure
 
 User  = get_user_model()
 
@@ -12,4 +14,38 @@ def new_user_created(sender, instance, created, **kwargs):
         org = Organisation.objects.create(
             name=f"{instance.firstName}'s Organisation",
         )
-        org.users.add(instance)
\ No newline at end of file
+        with removed_on_failure(org):
+            org.users.add(instance)
+            # Anything slower than the default organisation goes through the outbox
+            enqueue('user.registered', {'userId': str(instance.userId)})
+
+
+@receiver(m2m_changed, sender=Membership)
+def memberships_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # Keep the per-user directory in the default database in step with
+    # membership changes made on an organisation's shard
+    if reverse:
+        pairs = [(instance.pk, orgId) for orgId in pk_set or ()]
+    else:
+        pairs = [(userId, instance.pk) for userId in pk_set or ()]
+
+    if action == 'post_add':
+        MembershipDirectory.objects.bulk_create(
+            [MembershipDirectory(user_id=userId, orgId=orgId, shard=using) for userId, orgId in pairs],
+            ignore_conflicts=True,
+        )
+    elif action == 'post_remove':
+        for userId, orgId in pairs:
+            MembershipDirectory.objects.filter(user_id=userId, orgId=orgId).delete()
+    elif action == 'pre_clear':
+        lookup = {'user_id': instance.pk} if reverse else {'orgId': instance.pk}
+        MembershipDirectory.objects.filter(**lookup).delete()
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    # The cascade only reaches memberships in the user's own database,
+    # the directory says which shards hold the others
+    shards = set(MembershipDirectory.objects.filter(user=instance).values_list('shard', flat=True))
+    for shard in shards - {using}:
+        Membership.objects.using(shard).filter(user_id=instance.pk).delete()
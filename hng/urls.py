@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework.routers import SimpleRouter
-from .views import CustomTokenObtainPairView, UserViewSet, OrganisationViewSet
+from .views import CustomTokenObtainPairView, UserViewSet, OrganisationViewSet, ProfileViewSet
 
 
 router = SimpleRouter(trailing_slash=False)
@@ -11,6 +11,7 @@ urlpatterns = [
     path('auth/register', UserViewSet.as_view({'post': 'create'}), name='user-create'),
     path('api/users/<userId>', UserViewSet.as_view({'get': 'retrieve'}), name='get_user'),
     path('auth/login', CustomTokenObtainPairView.as_view(), name='login'),
+    path('api/profiles', ProfileViewSet.as_view({'get': 'list'}), name='profiles'),
 ]
 
 urlpatterns += router.urls
@@ -1,4 +1,9 @@
+import re
+
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
@@ -6,14 +11,42 @@ from rest_framework.decorators import action
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
-from .models import Organisation
-from .serializers import UserSerializer, OrganisationSerializer, AddUserSerializer
+from .models import Organisation, MembershipDirectory
+from .serializers import UserSerializer, OrganisationSerializer, AddUserSerializer, OrganisationMemberSerializer
 from .permissions import IsMember
+from .pagination import MembershipCursorPagination
+from .idempotency import idempotent
+from .profiling import ProfileStore
+from .sharding import removed_on_failure, shard_for
 
 User = get_user_model()
 
+# Only the public user columns are loaded when listing organisation members
+MEMBER_FIELDS = ('userId', 'firstName', 'lastName', 'email', 'phone')
+
+
+def violated_constraint(error):
+    """
+    Name of the constraint an IntegrityError reports. psycopg has it on the
+    driver error, SQLite only in the message: the index name, or the
+    table.column list for a column's own unique constraint.
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name
+    match = re.match(r"UNIQUE constraint failed: (?:index '(.+)'|(.+))", str(error))
+    return match and (match.group(1) or match.group(2))
+
+
+def email_constraints():
+    # The case-insensitive index, and the unique constraint of the column
+    # itself as PostgreSQL and SQLite name it
+    table = User._meta.db_table
+    return {constraint.name for constraint in User._meta.constraints} | {f'{table}_email_key', f'{table}.email'}
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
         try:
@@ -48,6 +81,7 @@ class UserViewSet(mixins.CreateModelMixin,
             permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -96,13 +130,29 @@ class UserViewSet(mixins.CreateModelMixin,
             return Response(payload, status=status.HTTP_400_BAD_REQUEST)
     
     def perform_create(self, serializer):
-        return serializer.save()
+        # The user, the directory entry for its default organisation and its
+        # outbox events commit together. The organisation and its membership
+        # are written on its shard, outside this transaction, and
+        # new_user_created deletes them if the rest of the registration fails.
+        # The email is not looked up beforehand, a duplicate is caught by the
+        # case-insensitive unique index instead
+        try:
+            with transaction.atomic():
+                return serializer.save()
+        except IntegrityError as error:
+            if violated_constraint(error) not in email_constraints():
+                raise
+            raise ValidationError({'email': ['user with this email address already exists.']})
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.userId != request.user.userId:
             # Check for shared organisation membership if requesting different user
-            shared_orgs = instance.organisation_set.filter(users=request.user)
+            # Answered from the membership directory, without visiting the shards
+            shared_orgs = MembershipDirectory.objects.filter(
+                user=instance,
+                orgId__in=MembershipDirectory.objects.filter(user=request.user).values('orgId'),
+            )
             if not shared_orgs.exists():
                 payload = {
                     'status': 'Unauthorized',
@@ -137,17 +187,49 @@ class OrganisationViewSet(mixins.CreateModelMixin,
     serializer_class = OrganisationSerializer
     lookup_field = 'orgId'
     permission_classes = [IsAuthenticated]
+    # Set when the directory places an organisation off its ring shard
+    shard = None
     
     def get_queryset(self):
         if self.action == 'list':
-            user = self.request.user
-            return self.queryset.filter(users__in=[user])
+            return self.get_user_organisations(self.request.user)
+        if self.lookup_field in self.kwargs:
+            return super().get_queryset().using(self.shard or shard_for(self.kwargs[self.lookup_field]))
         return super().get_queryset()
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Not on the shard the ring picks yet (shards were just added and
+            # rebalance_shards hasn't moved it), the directory knows where it is
+            self.shard = self.directory_shard(self.kwargs[self.lookup_field])
+            if self.shard is None:
+                raise
+            return super().get_object()
+
+    def directory_shard(self, orgId):
+        try:
+            shard = MembershipDirectory.objects.filter(orgId=orgId).values_list('shard', flat=True).first()
+        except DjangoValidationError:
+            return None
+        return shard if shard != shard_for(orgId) else None
+
+    def get_user_organisations(self, user):
+        # One query against the directory, then one per shard holding any of them
+        orgIds_by_shard = {}
+        for orgId, shard in MembershipDirectory.objects.filter(user=user).values_list('orgId', 'shard'):
+            orgIds_by_shard.setdefault(shard, []).append(orgId)
+        return [
+            organisation
+            for shard, orgIds in orgIds_by_shard.items()
+            for organisation in Organisation.objects.using(shard).filter(orgId__in=orgIds)
+        ]
     
     def get_permissions(self):
         if self.action == 'add_user':
             self.permission_classes = []
-        elif self.action == 'retrieve':
+        elif self.action in ('retrieve', 'list_users'):
             self.permission_classes = [IsMember]
         return super().get_permissions()      
     
@@ -156,12 +238,14 @@ class OrganisationViewSet(mixins.CreateModelMixin,
             return AddUserSerializer
         return super().get_serializer_class()
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
             org = serializer.save()
-            org.users.add(request.user)
+            with removed_on_failure(org):
+                org.users.add(request.user)
             payload = {
                 'status': 'success',
                 'message': 'Organisation created successfully',
@@ -211,6 +295,7 @@ class OrganisationViewSet(mixins.CreateModelMixin,
         return Response(payload, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], url_path="users")
+    @idempotent
     def add_user(self, request, *args, **kwargs):
         organisation = self.get_object()
         serializer = self.get_serializer(data=request.data)
@@ -223,3 +308,47 @@ class OrganisationViewSet(mixins.CreateModelMixin,
         }
         return Response(payload, status=status.HTTP_200_OK)
 
+    @add_user.mapping.get
+    def list_users(self, request, *args, **kwargs):
+        organisation = self.get_object()
+        # The page of memberships comes from the organisation's shard and
+        # its users from the default database, two queries whatever the page
+        memberships = organisation.membership_set.only('organisation', 'user')
+        paginator = MembershipCursorPagination()
+        page = paginator.paginate_queryset(memberships, request, view=self)
+        users = User.objects.only(*MEMBER_FIELDS).in_bulk([membership.user_id for membership in page])
+        members = [users[membership.user_id] for membership in page if membership.user_id in users]
+        serializer = OrganisationMemberSerializer(members, many=True)
+        payload = {
+            'status': 'success',
+            'message': 'Organisation users successfully retrieved',
+            'data': {
+                'users': serializer.data,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+            }
+        }
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]
+
+    def list(self, request, *args, **kwargs):
+        store = ProfileStore()
+        url_names = request.query_params.getlist('url_name') or store.url_names()
+        profiles = {
+            url_name: [
+                {key: value for key, value in entry.items() if key != 'stacks'}
+                for entry in store.entries(url_name)
+            ]
+            for url_name in url_names
+        }
+        payload = {
+            'status': 'success',
+            'message': 'Recorded profiles successfully retrieved',
+            'data': {
+                'profiles': profiles
+            }
+        }
+        return Response(payload, status=status.HTTP_200_OK)
@@ -0,0 +1,54 @@
+"""
+Fast fixture factories for the test suite.
+
+Users are bulk-created with a single password hash shared by the whole
+batch. Like any bulk_create this skips the post_save signal, so no
+default organisation or outbox event is created for them; register
+through the API when a test is about that behaviour.
+"""
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from hng.models import Organisation, Membership, MembershipDirectory
+
+User = get_user_model()
+
+PASSWORD = 'password123'
+
+sequence = count()
+
+
+def create_users(number, password=PASSWORD, **fields):
+    encoded = make_password(password)
+    users = []
+    for _ in range(number):
+        index = next(sequence)
+        users.append(User(**{
+            'email': f'user{index}@mail.com',
+            'firstName': 'user',
+            'lastName': str(index),
+            **fields,
+            'password': encoded,
+        }))
+    return User.objects.bulk_create(users)
+
+
+def create_user(email, password=PASSWORD, firstName='test', lastName='user', **fields):
+    user, = create_users(1, password=password, email=email, firstName=firstName, lastName=lastName, **fields)
+    return user
+
+
+def add_members(organisation, users):
+    shard = organisation._state.db
+    Membership.objects.using(shard).bulk_create([Membership(organisation=organisation, user=user) for user in users])
+    MembershipDirectory.objects.bulk_create([
+        MembershipDirectory(user=user, orgId=organisation.orgId, shard=shard) for user in users
+    ])
+
+
+def create_organisation(name='Org', members=(), **fields):
+    organisation = Organisation.objects.create(name=name, **fields)
+    add_members(organisation, members)
+    return organisation
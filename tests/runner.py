@@ -0,0 +1,61 @@
+"""
+Test runner for ``manage.py test``, selected by ``TEST_RUNNER`` in settings.
+
+The suite runs with one process per core unless ``--parallel`` says
+otherwise, and passwords are hashed with a cheap hasher so fixtures and
+logins don't pay for production-strength hashing.
+
+Two local SQLite databases, ``shard_0`` and ``shard_1``, are added when
+no shards are configured, so the sharding tests always have somewhere to
+spread organisations. Only tests that ask for them get them.
+"""
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner, ParallelTestSuite
+from django.test.utils import override_settings
+
+
+TEST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+LOCAL_SHARDS = ['shard_0', 'shard_1']
+
+
+def add_local_shards():
+    for alias in LOCAL_SHARDS:
+        settings.DATABASES.setdefault(alias, {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': settings.BASE_DIR / f'{alias}.sqlite3',
+        })
+    connections.configure_settings(settings.DATABASES)
+
+
+def setup_worker(*args):
+    add_local_shards()
+    override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS).enable()
+
+
+class FastParallelTestSuite(ParallelTestSuite):
+    # Forked workers inherit the shards and hashers, spawned ones set them up again
+    process_setup = setup_worker
+
+
+class FastTestRunner(DiscoverRunner):
+    parallel_test_suite = FastParallelTestSuite
+
+    def __init__(self, *args, **kwargs):
+        add_local_shards()
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel='auto')
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_hashers = override_settings(PASSWORD_HASHERS=TEST_PASSWORD_HASHERS)
+        self.test_hashers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_hashers.disable()
+        super().teardown_test_environment(**kwargs)
@@ -12,17 +12,22 @@ from rest_framework import status
 
 from hng.models import Organisation
 
+from .factories import create_user, create_organisation
+
 User = get_user_model()
 
 class TokenGenerationTests(TestCase):
 
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(
             email='testuser@mail.com',
             password='password123',
             firstName='test',
             lastName='user'
         )
+
+    def setUp(self):
         access_token = RefreshToken.for_user(self.user)
         self.decoded_token = jwt.decode(
             str(access_token.access_token), settings.SECRET_KEY, algorithms=['HS256']
@@ -48,12 +53,13 @@ class TokenGenerationTests(TestCase):
 
 class OrganisationAccessTests(APITestCase):
 
-    def setUp(self):
-        self.user = User.objects.create_user(email='testuser@mail.com', password='password123', firstName='test', lastName='user')
-        self.organisation1 = Organisation.objects.create(name='Org1')
-        self.organisation2 = Organisation.objects.create(name='Org2')
-        self.user.organisation_set.add(self.organisation1)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email='testuser@mail.com', password='password123', firstName='test', lastName='user')
+        cls.organisation1 = create_organisation(name='Org1', members=[cls.user])
+        cls.organisation2 = create_organisation(name='Org2')
 
+    def setUp(self):
         endpoint = '/auth/login'
         data = {'email': self.user.email, 'password': 'password123'}
         response = self.client.post(endpoint, data=data, format='json')
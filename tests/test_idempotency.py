@@ -0,0 +1,147 @@
+import hashlib
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import OperationalError
+from django.test import override_settings
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from hng import idempotency
+from hng.models import Organisation
+from hng.views import UserViewSet
+
+from .factories import create_user, create_organisation
+
+User = get_user_model()
+
+
+class IdempotencyKeyTests(APITestCase):
+
+    register_data = {
+        'email':'testuser@mail.com',
+        'password':'password123',
+        'firstName':'test',
+        'lastName':'user',
+        'phone':'+2348078675645'
+    }
+
+    def setUp(self):
+        caches['idempotency'].clear()
+
+    def login(self):
+        response = self.client.post('/auth/register', self.register_data, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['data']['accessToken'])
+
+    def test_register_replay_returns_original_response(self):
+        response = self.client.post('/auth/register', self.register_data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        replayed = self.client.post('/auth/register', self.register_data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(replayed.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replayed.data, response.data)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_create_organisation_is_not_duplicated(self):
+        self.login()
+        data = {'name': 'Org1', 'description': 'first'}
+        first = self.client.post('/api/organisations', data, format='json', HTTP_IDEMPOTENCY_KEY='org-1')
+        second = self.client.post('/api/organisations', data, format='json', HTTP_IDEMPOTENCY_KEY='org-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Organisation.objects.filter(name='Org1').count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.login()
+        data = {'name': 'Org1'}
+        self.client.post('/api/organisations', data, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        self.client.credentials()
+        self.client.post('/auth/register', {**self.register_data, 'email': 'other@mail.com'}, format='json')
+        other = User.objects.get(email='other@mail.com')
+        self.client.force_authenticate(other)
+        response = self.client.post('/api/organisations', data, format='json', HTTP_IDEMPOTENCY_KEY='shared')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Organisation.objects.filter(name='Org1').count(), 2)
+
+    def test_different_body_with_same_key_is_rejected(self):
+        self.login()
+        self.client.post('/api/organisations', {'name': 'Org1'}, format='json', HTTP_IDEMPOTENCY_KEY='org-1')
+        response = self.client.post('/api/organisations', {'name': 'Org2'}, format='json', HTTP_IDEMPOTENCY_KEY='org-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.data['errors'][0]['field'], 'Idempotency-Key')
+        self.assertFalse(Organisation.objects.filter(name='Org2').exists())
+
+    def test_add_user_replay(self):
+        self.login()
+        org = create_organisation(name='Org1')
+        other = create_user(email='other@mail.com', firstName='other')
+        url = f'/api/organisations/{org.orgId}/users'
+        first = self.client.post(url, {'userId': str(other.userId)}, format='json', HTTP_IDEMPOTENCY_KEY='add-1')
+        second = self.client.post(url, {'userId': str(other.userId)}, format='json', HTTP_IDEMPOTENCY_KEY='add-1')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_duplicate_waits_for_request_in_flight(self):
+        self.login()
+        data = {'name': 'Org1'}
+        cache = caches['idempotency']
+        request = mock.Mock(method='POST', path='/api/organisations', data=data, user=User.objects.get())
+        key = idempotency.cache_key(request, 'in-flight')
+        body = idempotency.fingerprint(request)
+        cache.set(key, {'state': idempotency.PENDING, 'fingerprint': body})
+        stored = {'state': idempotency.DONE, 'fingerprint': body, 'status': 201, 'data': {'status': 'success'}}
+        finisher = threading.Timer(0.2, cache.set, args=(key, stored))
+        finisher.start()
+        response = self.client.post('/api/organisations', data, format='json', HTTP_IDEMPOTENCY_KEY='in-flight')
+        finisher.join()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'status': 'success'})
+        self.assertFalse(Organisation.objects.filter(name='Org1').exists())
+
+    @override_settings(IDEMPOTENCY={'WAIT_TIMEOUT': 0.1})
+    def test_duplicate_gives_up_after_wait_timeout(self):
+        self.login()
+        data = {'name': 'Org1'}
+        request = mock.Mock(method='POST', path='/api/organisations', data=data, user=User.objects.get())
+        key = idempotency.cache_key(request, 'stuck')
+        caches['idempotency'].set(key, {'state': idempotency.PENDING, 'fingerprint': idempotency.fingerprint(request)})
+        response = self.client.post('/api/organisations', data, format='json', HTTP_IDEMPOTENCY_KEY='stuck')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Organisation.objects.filter(name='Org1').exists())
+
+    def test_anonymous_keys_are_scoped_per_body(self):
+        self.client.post('/auth/register', self.register_data, format='json', HTTP_IDEMPOTENCY_KEY='signup')
+        other = {**self.register_data, 'email': 'other@mail.com'}
+        response = self.client.post('/auth/register', other, format='json', HTTP_IDEMPOTENCY_KEY='signup')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(response.data['data']['user']['email'], 'other@mail.com')
+
+    def test_unexpected_failure_is_not_remembered(self):
+        with mock.patch.object(UserViewSet, 'perform_create', side_effect=OperationalError('database is down')):
+            failed = self.client.post('/auth/register', self.register_data, format='json', HTTP_IDEMPOTENCY_KEY='retry')
+        self.assertEqual(failed.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/auth/register', self.register_data, format='json', HTTP_IDEMPOTENCY_KEY='retry')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_fingerprint_is_keyed(self):
+        request = mock.Mock(data=self.register_data)
+        body = json.dumps(self.register_data, sort_keys=True)
+        fingerprint = idempotency.fingerprint(request)
+        self.assertNotEqual(fingerprint, hashlib.sha256(body.encode()).hexdigest())
+        with self.settings(SECRET_KEY='another-secret-key'):
+            self.assertNotEqual(idempotency.fingerprint(request), fingerprint)
+
+    def test_malformed_body_is_answered_as_without_the_header(self):
+        body = '{"email": '
+        without = self.client.post('/auth/register', body, content_type='application/json')
+        with_key = self.client.post('/auth/register', body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='bad')
+        self.assertEqual(with_key.status_code, without.status_code)
+        self.assertEqual(with_key.data, without.data)
+        self.assertEqual(with_key.data['message'], 'Registration unsuccessful')
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .factories import create_user, create_users, create_organisation
+
+User = get_user_model()
+
+
+class OrganisationUsersListTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email='member@mail.com', firstName='member')
+        cls.outsider = create_user(email='outsider@mail.com', firstName='outsider')
+        cls.organisation = create_organisation(name='Org1', members=[cls.user, *create_users(24)])
+        cls.url = f'/api/organisations/{cls.organisation.orgId}/users'
+
+    def login(self, user):
+        data = {'email': user.email, 'password': 'password123'}
+        response = self.client.post('/auth/login', data=data, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['data']['accessToken'])
+
+    def test_member_can_list_users(self):
+        self.login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        users = response.data['data']['users']
+        self.assertEqual(len(users), 25)
+        self.assertEqual(set(users[0]), {'userId', 'firstName', 'lastName', 'email', 'phone'})
+        self.assertIsNone(response.data['data']['next'])
+
+    def test_non_member_is_forbidden(self):
+        self.login(self.outsider)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unauthenticated_is_rejected(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_pages_use_constant_queries(self):
+        self.login(self.user)
+        url, seen = f'{self.url}?limit=10', []
+        while url:
+            # authentication, organisation lookup, membership check, the page of
+            # memberships and its users
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+            seen += [user['userId'] for user in response.data['data']['users']]
+            url = response.data['data']['next']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from hng import outbox
+from hng.models import OutboxEvent
+
+delivered = []
+
+
+def record_event(event):
+    delivered.append((event.topic, event.payload))
+
+
+def failing_hook(event):
+    raise RuntimeError('hook failed')
+
+
+OUTBOX = {
+    'HOOKS': {'user.registered': ['tests.test_outbox.record_event']},
+    'MAX_WORKERS': 2,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': timedelta(0),
+}
+
+
+@override_settings(OUTBOX=OUTBOX)
+class RegistrationOutboxTests(APITestCase):
+
+    def setUp(self):
+        delivered.clear()
+
+    def register(self):
+        data = {
+            'email':'testuser@mail.com',
+            'password':'password123',
+            'firstName':'test',
+            'lastName':'user',
+            'phone':'+2348078675645'
+        }
+        return self.client.post('/auth/register', data, format='json')
+
+    def test_registration_enqueues_without_running_hooks(self):
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.topic, 'user.registered')
+        self.assertEqual(event.payload, {'userId': response.data['data']['user']['userId']})
+        self.assertEqual(delivered, [])
+
+    def test_failed_registration_enqueues_nothing(self):
+        self.register()
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_run_outbox_delivers_and_removes_events(self):
+        response = self.register()
+        call_command('run_outbox', '--once', stdout=StringIO())
+        self.assertEqual(delivered, [('user.registered', {'userId': response.data['data']['user']['userId']})])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class DrainTests(TestCase):
+
+    def setUp(self):
+        delivered.clear()
+
+    @override_settings(OUTBOX={**OUTBOX, 'HOOKS': {'user.registered': ['tests.test_outbox.failing_hook']}})
+    def test_failing_hook_is_retried_until_max_attempts(self):
+        outbox.enqueue('user.registered', {})
+        self.assertEqual(outbox.drain_all(), 3)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.status, OutboxEvent.FAILED)
+        self.assertEqual(event.attempts, 3)
+        self.assertIn('hook failed', event.last_error)
+
+    @override_settings(OUTBOX=OUTBOX)
+    def test_events_are_drained_in_batches(self):
+        for index in range(5):
+            outbox.enqueue('user.registered', {'index': index})
+        self.assertEqual(outbox.drain_all(batch_size=2), 5)
+        self.assertEqual(sorted(payload['index'] for _, payload in delivered), [0, 1, 2, 3, 4])
+
+    @override_settings(OUTBOX=OUTBOX)
+    def test_events_not_yet_due_are_skipped(self):
+        outbox.enqueue('user.registered', {})
+        OutboxEvent.objects.update(available_at=OutboxEvent.objects.get().available_at + timedelta(hours=1))
+        self.assertEqual(outbox.drain_all(), 0)
+        self.assertEqual(delivered, [])
+
+    @override_settings(OUTBOX={**OUTBOX, 'HOOKS': {}})
+    def test_topic_without_hooks_is_not_recorded(self):
+        self.assertIsNone(outbox.enqueue('user.registered', {}))
+        self.assertFalse(OutboxEvent.objects.exists())
@@ -0,0 +1,122 @@
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from hng.hashers import RehashQueue, needs_rehash
+
+from .factories import create_user
+
+User = get_user_model()
+
+HASHERS = [
+    'hng.hashers.TunablePBKDF2PasswordHasher',
+    'hng.hashers.TunableScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PROFILES = {
+    'pbkdf2_sha256': {'iterations': 1000},
+    'scrypt': {'work_factor': 2 ** 4},
+}
+
+
+@override_settings(PASSWORD_HASHERS=HASHERS, PASSWORD_HASHER_PROFILES=PROFILES, PASSWORD_REHASH_IN_BACKGROUND=False)
+class RehashOnLoginTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email='testuser@mail.com')
+
+    def login(self, password='password123'):
+        data = {'email': 'testuser@mail.com', 'password': password}
+        return self.client.post('/auth/login', data=data, format='json')
+
+    def set_hash(self, encoded):
+        User.objects.filter(pk=self.user.pk).update(password=encoded)
+
+    def stored_hash(self):
+        return User.objects.get(pk=self.user.pk).password
+
+    def test_profile_parameters_are_used(self):
+        self.assertEqual(identify_hasher(self.stored_hash()).decode(self.stored_hash())['iterations'], 1000)
+        self.assertFalse(needs_rehash(self.stored_hash()))
+
+    def test_legacy_algorithm_is_upgraded_on_login(self):
+        self.set_hash(make_password('password123', hasher='pbkdf2_sha1'))
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(identify_hasher(self.stored_hash()).algorithm, 'pbkdf2_sha256')
+
+    def test_changed_profile_is_applied_on_login(self):
+        with self.settings(PASSWORD_HASHER_PROFILES={'pbkdf2_sha256': {'iterations': 2000}}):
+            self.assertTrue(needs_rehash(self.stored_hash()))
+            self.login()
+            encoded = self.stored_hash()
+            self.assertEqual(identify_hasher(encoded).decode(encoded)['iterations'], 2000)
+
+    def test_preferred_hasher_can_be_switched(self):
+        with self.settings(PASSWORD_HASHERS=[HASHERS[1], HASHERS[0]]):
+            self.login()
+            self.assertEqual(identify_hasher(self.stored_hash()).algorithm, 'scrypt')
+        # The old hash keeps verifying after switching back
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_failed_login_does_not_rehash(self):
+        legacy = make_password('password123', hasher='pbkdf2_sha1')
+        self.set_hash(legacy)
+        response = self.login(password='password1234')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.stored_hash(), legacy)
+
+    def test_rehash_runs_in_background_by_default(self):
+        legacy = make_password('password123', hasher='pbkdf2_sha1')
+        self.set_hash(legacy)
+        with self.settings(PASSWORD_REHASH_IN_BACKGROUND=True), mock.patch('hng.hashers._rehashes') as rehashes:
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rehashes.submit.assert_called_once()
+        self.assertEqual(self.stored_hash(), legacy)
+
+
+class RehashQueueTests(TestCase):
+
+    def test_failures_are_logged(self):
+        queue = RehashQueue()
+        with mock.patch('hng.hashers.rehash', side_effect=RuntimeError('boom')), \
+                self.assertLogs('hng.hashers', 'ERROR') as logs:
+            queue.submit(1, 'encoded', 'password123')
+            queue.executor.shutdown()
+        self.assertIn('boom', logs.output[0])
+        self.assertEqual(queue.pending, 0)
+
+    @override_settings(PASSWORD_REHASH_MAX_PENDING=1)
+    def test_rehashes_past_the_limit_are_dropped(self):
+        queue = RehashQueue()
+        release = threading.Event()
+        with mock.patch('hng.hashers.rehash', side_effect=lambda *args: release.wait(5)) as rehash:
+            self.assertIsNotNone(queue.submit(1, 'encoded', 'password123'))
+            with self.assertLogs('hng.hashers', 'WARNING'):
+                self.assertIsNone(queue.submit(2, 'encoded', 'password123'))
+            release.set()
+            queue.executor.shutdown()
+        rehash.assert_called_once_with(1, 'encoded', 'password123')
+
+
+@override_settings(PASSWORD_HASHERS=HASHERS, PASSWORD_HASHER_PROFILES=PROFILES)
+class BenchHashersCommandTests(TestCase):
+
+    def test_reports_every_hasher(self):
+        out = StringIO()
+        call_command('bench_hashers', '--duration', '0.01', stdout=out)
+        output = out.getvalue()
+        for algorithm in ('pbkdf2_sha256 (default)', 'scrypt', 'pbkdf2_sha1'):
+            self.assertIn(algorithm, output)
+        self.assertIn("'iterations': 1000", output)
@@ -0,0 +1,127 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from hng.profiling import ProfileStore
+from hng.views import OrganisationViewSet
+
+from .factories import create_user
+
+User = get_user_model()
+
+CACHES = {
+    **settings.CACHES,
+    'profiling': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-profiling'},
+}
+
+
+def slow_list(view, request, *args, **kwargs):
+    # Sleeping releases the GIL, giving the sampler thread time to run
+    time.sleep(0.05)
+    return Response({})
+
+
+@override_settings(CACHES=CACHES, PROFILING={'ENABLED': True, 'SAMPLING_INTERVAL': 0.001})
+class ProfilingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_user(email='staff@mail.com', is_staff=True)
+        cls.user = create_user(email='testuser@mail.com')
+
+    def setUp(self):
+        ProfileStore().clear()
+
+    def login(self, user):
+        data = {'email': user.email, 'password': 'password123'}
+        response = self.client.post('/auth/login', data=data, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['data']['accessToken'])
+
+    def test_staff_header_records_cprofile_entry(self):
+        self.login(self.staff)
+        response = self.client.get('/api/organisations', HTTP_X_PROFILE='cprofile')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        entry, = ProfileStore().entries('organisation-list')
+        self.assertEqual(entry['mode'], 'cprofile')
+        self.assertTrue(entry['top'])
+        self.assertLessEqual(len(entry['top']), 25)
+
+    def test_non_staff_header_is_ignored(self):
+        self.login(self.user)
+        self.client.get('/api/organisations', HTTP_X_PROFILE='cprofile')
+        self.assertEqual(ProfileStore().url_names(), [])
+
+    def test_sample_rate_profiles_without_header(self):
+        with self.settings(PROFILING={'ENABLED': True, 'SAMPLE_RATE': 1.0}):
+            self.client.post('/auth/login', data={'email': self.user.email, 'password': 'password123'}, format='json')
+        self.assertEqual(ProfileStore().url_names(), ['login'])
+
+    def test_buffer_keeps_latest_entries(self):
+        self.login(self.staff)
+        with self.settings(PROFILING={'ENABLED': True, 'BUFFER_SIZE': 2}):
+            for _ in range(3):
+                self.client.get('/api/organisations', HTTP_X_PROFILE='cprofile')
+            self.assertEqual(len(ProfileStore().entries('organisation-list')), 2)
+
+    def test_profiles_endpoint_is_staff_only(self):
+        self.login(self.user)
+        response = self.client.get('/api/profiles')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.login(self.staff)
+        self.client.get('/api/organisations', HTTP_X_PROFILE='cprofile')
+        response = self.client.get('/api/profiles')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['data']['profiles']), ['organisation-list'])
+
+    def test_dump_profiles_writes_collapsed_stacks(self):
+        self.login(self.staff)
+        with mock.patch.object(OrganisationViewSet, 'list', autospec=True, side_effect=slow_list):
+            self.client.get('/api/organisations', HTTP_X_PROFILE='sampling')
+        out = StringIO()
+        call_command('dump_profiles', '--clear', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('organisation-list;'))
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any('slow_list' in line for line in lines))
+        self.assertEqual(ProfileStore().url_names(), [])
+
+    def test_buffer_entries_keep_their_order(self):
+        with self.settings(PROFILING={'ENABLED': True, 'BUFFER_SIZE': 3}):
+            store = ProfileStore()
+            for number in range(5):
+                store.record('login', {'number': number})
+            self.assertEqual([entry['number'] for entry in store.entries('login')], [2, 3, 4])
+
+
+class AdminAccessTests(APITestCase):
+
+    def change_permission(self, user):
+        request = RequestFactory().get('/admin/')
+        request.user = user
+        return admin.site.get_model_admin(User).has_change_permission(request)
+
+    def test_staff_are_not_admin_superusers(self):
+        staff = create_user(email='staff@mail.com', is_staff=True)
+        self.assertFalse(self.change_permission(staff))
+        self.client.force_login(staff)
+        response = self.client.get(f'/admin/hng/user/{staff.pk}/change/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_superusers_get_the_admin(self):
+        superuser = User.objects.create_superuser('admin@mail.com', 'password123', firstName='ad', lastName='min')
+        self.assertTrue(superuser.is_staff)
+        self.assertTrue(self.change_permission(superuser))
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from hng.serializers import UserSerializer
+from hng.views import email_constraints, violated_constraint
+
+from .factories import create_user
+
+User = get_user_model()
+
+
+class EmailUniquenessTests(APITestCase):
+
+    url = '/auth/register'
+
+    def register(self, email):
+        return self.client.post(self.url, {
+            'email': email,
+            'password': 'password123',
+            'firstName': 'test',
+            'lastName': 'user',
+            'phone': '',
+        }, format='json')
+
+    def test_email_is_not_looked_up_before_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.register('testuser@mail.com')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        lookups = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and '"hng_user"."email"' in query['sql']
+        ]
+        self.assertEqual(lookups, [])
+
+    def test_email_differing_in_case_is_duplicate(self):
+        create_user(email='Foo@mail.com')
+        response = self.register('foo@MAIL.com')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.data['errors'][0]['field'], 'email')
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_login_ignores_email_case(self):
+        create_user(email='Foo@mail.com', password='password123')
+        response = self.client.post('/auth/login', {'email': 'FOO@mail.com', 'password': 'password123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['user']['email'], 'Foo@mail.com')
+
+    def test_other_integrity_errors_are_not_reported_as_duplicates(self):
+        error = IntegrityError('UNIQUE constraint failed: hng_user.phone_email')
+        with mock.patch.object(UserSerializer, 'save', side_effect=error):
+            response = self.register('testuser@mail.com')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_with_non_ascii_uppercase_email(self):
+        response = self.register('foo@ÜX.com')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/auth/login', {'email': 'foo@ÜX.com', 'password': 'password123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ViolatedConstraintTests(APITestCase):
+
+    def test_psycopg_reports_the_constraint(self):
+        error = IntegrityError('duplicate key value violates unique constraint')
+        error.__cause__ = Exception()
+        error.__cause__.diag = SimpleNamespace(constraint_name='hng_user_email_key')
+        self.assertEqual(violated_constraint(error), 'hng_user_email_key')
+        self.assertIn(violated_constraint(error), email_constraints())
+
+    def test_sqlite_message_is_parsed(self):
+        index = IntegrityError("UNIQUE constraint failed: index 'hng_user_email_ci_unique'")
+        column = IntegrityError('UNIQUE constraint failed: hng_user.email')
+        self.assertEqual(violated_constraint(index), 'hng_user_email_ci_unique')
+        self.assertEqual(violated_constraint(column), 'hng_user.email')
+        self.assertIsNone(violated_constraint(IntegrityError('NOT NULL constraint failed: hng_user.firstName')))
@@ -0,0 +1,87 @@
+import json
+from io import StringIO
+from tempfile import NamedTemporaryFile
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from hng.models import Organisation
+from hng.replay import Bindings, Replayer, TestClientTransport, percentile
+
+User = get_user_model()
+
+LOG = [
+    {'method': 'GET', 'path': '/api/organisations', 'identity': 'alice'},
+    {'method': 'POST', 'path': '/api/organisations', 'identity': 'alice',
+     'body': {'name': 'Team ${run}'}, 'capture': {'team': 'data.orgId'}},
+    {'method': 'POST', 'path': '/api/organisations/${team}/users', 'identity': 'alice',
+     'body': {'userId': '${bob.userId}'}},
+    {'method': 'GET', 'path': '/api/organisations/${team}', 'identity': 'bob'},
+    {'method': 'GET', 'path': '/api/organisations/${alice.orgId}', 'identity': 'bob'},
+    {'method': 'POST', 'path': '/auth/login', 'body': {'email': '${alice.email}', 'password': 'wrong'}},
+]
+
+
+class ReplayTests(TestCase):
+
+    def replay(self, log, **kwargs):
+        replayer = Replayer(TestClientTransport(), concurrency=1, **kwargs)
+        return replayer.run(json.dumps(record) for record in log)
+
+    def test_replay_reports_per_route(self):
+        report = self.replay(LOG)
+        routes = report['routes']
+        self.assertEqual(routes['GET organisation-list']['statuses'], {200: 1})
+        self.assertEqual(routes['POST organisation-list']['statuses'], {201: 1})
+        self.assertEqual(routes['POST organisation-add-user']['statuses'], {200: 1})
+        # Different organisations, one route
+        self.assertEqual(routes['GET organisation-detail']['statuses'], {200: 1, 403: 1})
+        self.assertEqual(routes['POST login']['statuses'], {401: 1})
+        self.assertEqual(report['total']['requests'], 6)
+        self.assertEqual(report['total']['client_errors'], 2)
+        self.assertEqual(report['total']['error_rate'], 0)
+        self.assertGreater(report['total']['p99_ms'], 0)
+
+    def test_identities_get_fresh_users(self):
+        self.replay(LOG)
+        self.replay(LOG)
+        self.assertEqual(User.objects.filter(email__endswith='@replay.local').count(), 4)
+        self.assertEqual(Organisation.objects.filter(name__startswith='Team ').count(), 2)
+
+    def test_unbound_capture_counts_as_error(self):
+        log = [{'method': 'GET', 'path': '/api/organisations/${missing}', 'identity': 'alice'}]
+        report = self.replay(log, capture_timeout=0.01)
+        route = report['routes']['GET /api/organisations/${missing}']
+        self.assertEqual(route['error_rate'], 1)
+        self.assertIn('missing', route['last_error'])
+
+    def test_command_reads_log_file(self):
+        with NamedTemporaryFile('w', suffix='.jsonl') as log:
+            log.write('\n'.join(json.dumps(record) for record in LOG[:2]))
+            log.flush()
+            out = StringIO()
+            with self.assertRaisesMessage(CommandError, '--allow-writes'):
+                call_command('replay_traffic', log.name, stdout=out)
+            call_command('replay_traffic', log.name, '--allow-writes', '--concurrency', '1', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['total']['requests'], 2)
+
+
+class BindingsTests(TestCase):
+
+    def test_substitutes_nested_values(self):
+        bindings = Bindings(timeout=0)
+        bindings.set('team', 'abc')
+        self.assertEqual(
+            bindings.substitute({'path': '/x/${team}', 'list': ['$team', 1], 'cost': '$$5'}),
+            {'path': '/x/abc', 'list': ['abc', 1], 'cost': '$5'},
+        )
+
+    def test_percentile(self):
+        ordered = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(ordered, 0.5), 50.0)
+        self.assertEqual(percentile(ordered, 0.99), 99.0)
+        self.assertEqual(percentile(ordered, 1.0), 100.0)
+        self.assertEqual(percentile([3.0], 0.5), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
@@ -0,0 +1,235 @@
+from collections import Counter
+from io import StringIO
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from hng.models import Organisation, Membership, MembershipDirectory
+from hng.sharding import HashRing, shard_for
+from hng.management.commands.rebalance_shards import Command
+
+from .factories import add_members, create_user, create_organisation
+
+User = get_user_model()
+
+SHARDS = ['shard_0', 'shard_1']
+
+
+class HashRingTests(TestCase):
+
+    def test_keys_spread_over_every_node(self):
+        ring = HashRing(['a', 'b', 'c'])
+        placements = Counter(ring.node_for(uuid4()) for _ in range(3000))
+        self.assertEqual(set(placements), {'a', 'b', 'c'})
+        for count in placements.values():
+            self.assertGreater(count, 600)
+
+    def test_adding_a_node_only_moves_its_share(self):
+        keys = [uuid4() for _ in range(3000)]
+        before, after = HashRing(['a', 'b', 'c']), HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in keys if before.node_for(key) != after.node_for(key)]
+        self.assertTrue(all(after.node_for(key) == 'd' for key in moved))
+        self.assertLess(len(moved), len(keys) / 2)
+
+
+@override_settings(ORGANISATION_SHARDS=SHARDS)
+class ShardedOrganisationTests(APITestCase):
+    databases = {'default', *SHARDS}
+
+    register_data = {
+        'email':'testuser@mail.com',
+        'password':'password123',
+        'firstName':'test',
+        'lastName':'user',
+        'phone':'+2348078675645'
+    }
+
+    def register(self, **data):
+        response = self.client.post('/auth/register', {**self.register_data, **data}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['data']['accessToken'])
+        return User.objects.get(userId=response.data['data']['user']['userId'])
+
+    def create_organisations(self, number):
+        return [
+            self.client.post('/api/organisations', {'name': f'Org{index}'}, format='json').data['data']['orgId']
+            for index in range(number)
+        ]
+
+    def test_organisations_are_stored_on_their_shard(self):
+        user = self.register()
+        self.create_organisations(10)
+        directory = MembershipDirectory.objects.filter(user=user)
+        self.assertEqual(directory.count(), 11)
+        for entry in directory:
+            self.assertEqual(entry.shard, shard_for(entry.orgId))
+            self.assertTrue(Organisation.objects.using(entry.shard).filter(orgId=entry.orgId).exists())
+            self.assertTrue(Membership.objects.using(entry.shard).filter(organisation_id=entry.orgId, user=user).exists())
+        self.assertEqual({entry.shard for entry in directory}, set(SHARDS))
+        self.assertFalse(Organisation.objects.using('default').exists())
+
+    def test_list_fans_out_over_shards(self):
+        self.register()
+        orgIds = self.create_organisations(10)
+        response = self.client.get('/api/organisations')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        listed = {organisation['orgId'] for organisation in response.data['data']['organisations']}
+        self.assertTrue(set(orgIds) <= listed)
+        self.assertEqual(len(listed), 11)
+
+    def test_retrieve_and_membership_checks(self):
+        self.register()
+        orgId, = self.create_organisations(1)
+        self.assertEqual(self.client.get(f'/api/organisations/{orgId}').status_code, status.HTTP_200_OK)
+        self.register(email='outsider@mail.com')
+        self.assertEqual(self.client.get(f'/api/organisations/{orgId}').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(f'/api/organisations/{uuid4()}').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_add_user_and_list_members(self):
+        owner = self.register()
+        orgId, = self.create_organisations(1)
+        other = create_user(email='other@mail.com')
+        response = self.client.post(f'/api/organisations/{orgId}/users', {'userId': str(other.userId)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(f'/api/organisations/{orgId}/users')
+        self.assertEqual(
+            {user['email'] for user in response.data['data']['users']},
+            {owner.email, other.email},
+        )
+        # Sharing an organisation lets users see each other
+        response = self.client.get(f'/api/users/{other.userId}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_organisations_not_yet_rebalanced_stay_reachable(self):
+        with self.settings(ORGANISATION_SHARDS=['default']):
+            self.register()
+            orgId, = self.create_organisations(1)
+        self.assertTrue(Organisation.objects.using('default').filter(orgId=orgId).exists())
+
+        other = create_user(email='other@mail.com')
+        self.assertEqual(self.client.get(f'/api/organisations/{orgId}').status_code, status.HTTP_200_OK)
+        response = self.client.post(f'/api/organisations/{orgId}/users', {'userId': str(other.userId)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Membership.objects.using('default').filter(organisation_id=orgId, user=other).exists())
+        response = self.client.get(f'/api/organisations/{orgId}/users')
+        self.assertEqual(len(response.data['data']['users']), 2)
+        self.assertEqual(self.client.get('/api/organisations/not-a-uuid').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RebalanceShardsTests(TestCase):
+    databases = {'default', *SHARDS}
+
+    def test_rebalance_moves_organisations_to_new_shard(self):
+        user = create_user(email='testuser@mail.com')
+        with self.settings(ORGANISATION_SHARDS=['shard_0']):
+            organisations = [create_organisation(name=f'Org{index}', members=[user]) for index in range(20)]
+        self.assertEqual(Organisation.objects.using('shard_0').count(), 20)
+
+        with self.settings(ORGANISATION_SHARDS=SHARDS):
+            out = StringIO()
+            call_command('rebalance_shards', '--dry-run', stdout=out)
+            self.assertEqual(Organisation.objects.using('shard_1').count(), 0)
+            expected = [organisation for organisation in organisations if shard_for(organisation.orgId) == 'shard_1']
+            self.assertIn(f"{len(expected)} organisations to move", out.getvalue())
+
+            call_command('rebalance_shards', '--batch-size', '3', stdout=StringIO())
+            for organisation in organisations:
+                shard = shard_for(organisation.orgId)
+                self.assertTrue(Organisation.objects.using(shard).filter(orgId=organisation.orgId).exists())
+                self.assertTrue(Membership.objects.using(shard).filter(organisation_id=organisation.orgId, user=user).exists())
+                self.assertEqual(MembershipDirectory.objects.get(orgId=organisation.orgId).shard, shard)
+            self.assertEqual(Organisation.objects.using('shard_1').count(), len(expected))
+            self.assertEqual(Organisation.objects.using('shard_0').count(), 20 - len(expected))
+            self.assertEqual(Membership.objects.using('shard_0').count(), 20 - len(expected))
+
+    def test_member_added_during_a_move_is_kept(self):
+        user, late = create_user(email='testuser@mail.com'), create_user(email='late@mail.com')
+        with self.settings(ORGANISATION_SHARDS=['shard_0']):
+            organisations = [create_organisation(name=f'Org{index}', members=[user]) for index in range(10)]
+        with self.settings(ORGANISATION_SHARDS=SHARDS):
+            organisation = next(org for org in organisations if shard_for(org.orgId) == 'shard_1')
+            copy_memberships = Command.copy_memberships
+
+            def add_member_after_first_copy(command, orgId, source, target):
+                copy_memberships(command, orgId, source, target)
+                if orgId == organisation.orgId and not Membership.objects.using(source).filter(user=late).exists():
+                    add_members(organisation, [late])
+
+            with mock.patch.object(Command, 'copy_memberships', autospec=True, side_effect=add_member_after_first_copy):
+                call_command('rebalance_shards', '--source', 'shard_0', stdout=StringIO())
+
+        members = Membership.objects.using('shard_1').filter(organisation_id=organisation.orgId)
+        self.assertEqual({membership.user_id for membership in members}, {user.pk, late.pk})
+        self.assertEqual(MembershipDirectory.objects.get(orgId=organisation.orgId, user=late).shard, 'shard_1')
+        self.assertFalse(Membership.objects.using('shard_0').filter(user=late).exists())
+
+
+class ReverseRelationTests(TestCase):
+    databases = {'default', *SHARDS}
+
+    def test_adding_from_the_user_side_is_refused_across_shards(self):
+        user = create_user(email='testuser@mail.com')
+        with self.settings(ORGANISATION_SHARDS=SHARDS):
+            organisation = create_organisation(name='Org')
+            with self.assertRaisesMessage(ValueError, 'organisation.users.add(user)'):
+                user.organisation_set.add(organisation)
+        self.assertFalse(Membership.objects.using('default').exists())
+        self.assertFalse(MembershipDirectory.objects.exists())
+
+    def test_adding_from_the_user_side_works_on_a_single_shard(self):
+        user = create_user(email='testuser@mail.com')
+        with self.settings(ORGANISATION_SHARDS=['shard_1']):
+            organisation = create_organisation(name='Org')
+            user.organisation_set.add(organisation)
+        self.assertTrue(Membership.objects.using('shard_1').filter(organisation=organisation, user=user).exists())
+        self.assertEqual(MembershipDirectory.objects.get(user=user).shard, 'shard_1')
+
+
+class UserDeletionTests(TestCase):
+    databases = {'default', *SHARDS}
+
+    def test_deleting_a_user_removes_memberships_on_every_shard(self):
+        user = create_user(email='testuser@mail.com')
+        other = create_user(email='other@mail.com')
+        with self.settings(ORGANISATION_SHARDS=SHARDS):
+            organisations = [create_organisation(name=f'Org{index}', members=[user, other]) for index in range(10)]
+        self.assertEqual({organisation._state.db for organisation in organisations}, set(SHARDS))
+        userId = user.pk
+        user.delete()
+        for shard in SHARDS:
+            self.assertFalse(Membership.objects.using(shard).filter(user_id=userId).exists())
+            self.assertTrue(Membership.objects.using(shard).filter(user=other).exists())
+        self.assertFalse(MembershipDirectory.objects.filter(user_id=userId).exists())
+
+
+@override_settings(ORGANISATION_SHARDS=SHARDS)
+class FailedCreationTests(TransactionTestCase):
+    # Each database commits on its own, as outside of tests
+    databases = {'default', *SHARDS}
+
+    def test_default_organisation_is_removed_from_its_shard(self):
+        with mock.patch('hng.signals.enqueue', side_effect=RuntimeError('outbox unavailable')):
+            response = self.client.post('/auth/register', ShardedOrganisationTests.register_data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.exists())
+        for shard in SHARDS:
+            self.assertFalse(Organisation.objects.using(shard).exists())
+            self.assertFalse(Membership.objects.using(shard).exists())
+
+    def test_failed_organisation_create_is_removed_from_its_shard(self):
+        self.client.post('/auth/register', ShardedOrganisationTests.register_data, content_type='application/json')
+        token = self.client.post('/auth/login', {'email': 'testuser@mail.com', 'password': 'password123'},
+                                 content_type='application/json').json()['data']['accessToken']
+        before = {shard: Organisation.objects.using(shard).count() for shard in SHARDS}
+        with mock.patch('hng.signals.MembershipDirectory.objects.bulk_create', side_effect=RuntimeError('directory down')):
+            response = self.client.post('/api/organisations', {'name': 'Org'}, content_type='application/json',
+                                        HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual({shard: Organisation.objects.using(shard).count() for shard in SHARDS}, before)
+        self.assertEqual(sum(Membership.objects.using(shard).count() for shard in SHARDS), 1)